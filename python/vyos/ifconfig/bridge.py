@@ -13,12 +13,25 @@
 # You should have received a copy of the GNU Lesser General Public
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+import socket
+
 from vyos.ifconfig.interface import Interface
 from vyos.ifconfig.stp import STP
 from vyos.validate import assert_boolean
 from vyos.validate import assert_positive
 from vyos.util import cmd
-from vyos.util import vyos_dict_search
+
+try:
+    from pyroute2 import IPRoute
+except ImportError:
+    # fall back to ip(8) if pyroute2 is not available, e.g. when running
+    # from a source tree
+    IPRoute = None
+
+def _centiseconds(time):
+    """ Convert time in seconds to kernel representation in centiseconds """
+    return int(time) * 100
 
 @Interface.register
 class BridgeIf(Interface):
@@ -46,22 +59,22 @@ class BridgeIf(Interface):
     _sysfs_set = {**Interface._sysfs_set, **{
         'ageing_time': {
             'validate': assert_positive,
-            'convert': lambda t: int(t) * 100,
+            'convert': _centiseconds,
             'location': '/sys/class/net/{ifname}/bridge/ageing_time',
         },
         'forward_delay': {
             'validate': assert_positive,
-            'convert': lambda t: int(t) * 100,
+            'convert': _centiseconds,
             'location': '/sys/class/net/{ifname}/bridge/forward_delay',
         },
         'hello_time': {
             'validate': assert_positive,
-            'convert': lambda t: int(t) * 100,
+            'convert': _centiseconds,
             'location': '/sys/class/net/{ifname}/bridge/hello_time',
         },
         'max_age': {
             'validate': assert_positive,
-            'convert': lambda t: int(t) * 100,
+            'convert': _centiseconds,
             'location': '/sys/class/net/{ifname}/bridge/max_age',
         },
         'priority': {
@@ -78,15 +91,88 @@ class BridgeIf(Interface):
         },
     }}
 
-    _command_set = {**Interface._command_set, **{
-        'add_port': {
-            'shellcmd': 'ip link set dev {value} master {ifname}',
-        },
-        'del_port': {
-            'shellcmd': 'ip link set dev {value} nomaster',
-        },
-    }}
+    # mapping of _sysfs_set names to ip-link(8) bridge type options
+    _bridge_options = {
+        'ageing_time': 'ageing_time',
+        'forward_delay': 'forward_delay',
+        'hello_time': 'hello_time',
+        'max_age': 'max_age',
+        'priority': 'priority',
+        'stp': 'stp_state',
+        'multicast_querier': 'mcast_querier',
+    }
+
+    # bridge options set by update() and their CLI configuration key
+    _update_options = (
+        ('ageing_time', 'aging'),
+        ('forward_delay', 'forwarding_delay'),
+        ('hello_time', 'hello_time'),
+        ('max_age', 'max_age'),
+        ('priority', 'priority'),
+    )
+
+    # bridge(8) member port options set by update() and their STP _sysfs_set
+    # name, the CLI configuration key is the same as the bridge(8) option
+    _port_options = (
+        ('cost', 'path_cost'),
+        ('priority', 'path_priority'),
+    )
+
+    def _link_index(self, name):
+        """
+        Return interface index of interface name. It is looked up on every
+        call as interfaces can be deleted and re-created at any time, using
+        if_nametoindex(3) which does not dump all links via netlink.
+        """
+        return socket.if_nametoindex(name)
+
+    def _bridge_params_cmd(self, params, validated=False):
+        """
+        Return ip(8) command (without the leading 'ip') setting multiple
+        bridge options, or None if no option needs to be changed. See
+        _apply_bridge_params() for params and validated.
+        """
+        options = []
+        for name, value in params.items():
+            # the code can pass int as int
+            value = str(value)
+
+            if not validated:
+                self._validate(self._sysfs_set[name], name, value)
 
+            convert = self._sysfs_set[name].get('convert', None)
+            if convert:
+                value = convert(value)
+
+            # the kernel exposes the current value in sysfs - no need to
+            # change what is already set
+            location = self._sysfs_set[name]['location'].format(**self.config)
+            if os.path.isfile(location) and self._read_sysfs(location) == str(value):
+                continue
+
+            options.append(f'{self._bridge_options[name]} {value}')
+
+        if not options:
+            return None
+        return f'link set dev {self.ifname} type bridge ' + ' '.join(options)
+
+    def _apply_bridge_params(self, params, validated=False):
+        """
+        Set multiple bridge options using one ip(8) call which results in a
+        single RTM_NEWLINK netlink message instead of one sysfs write per
+        option. Keys of params are the names used in _sysfs_set, values are
+        validated and converted the same way as for a sysfs write. Options
+        which already have the requested value are skipped. Validation is
+        skipped if validated is True.
+
+        Example:
+        >>> from vyos.ifconfig import BridgeIf
+        >>> BridgeIf('br0')._apply_bridge_params({'stp': 1, 'priority': 8192})
+        """
+        tmp = self._bridge_params_cmd(params, validated)
+        if not tmp:
+            return None
+        return self._cmd(f'ip {tmp}')
 
     def set_ageing_time(self, time):
         """
@@ -97,7 +183,7 @@ class BridgeIf(Interface):
         >>> from vyos.ifconfig import BridgeIf
         >>> BridgeIf('br0').ageing_time(2)
         """
-        self.set_interface('ageing_time', time)
+        self._apply_bridge_params({'ageing_time': time})
 
     def set_forward_delay(self, time):
         """
@@ -108,7 +194,7 @@ class BridgeIf(Interface):
         >>> from vyos.ifconfig import BridgeIf
         >>> BridgeIf('br0').forward_delay(15)
         """
-        self.set_interface('forward_delay', time)
+        self._apply_bridge_params({'forward_delay': time})
 
     def set_hello_time(self, time):
         """
@@ -119,7 +205,7 @@ class BridgeIf(Interface):
         >>> from vyos.ifconfig import BridgeIf
         >>> BridgeIf('br0').set_hello_time(2)
         """
-        self.set_interface('hello_time', time)
+        self._apply_bridge_params({'hello_time': time})
 
     def set_max_age(self, time):
         """
@@ -130,7 +216,7 @@ class BridgeIf(Interface):
         >>> from vyos.ifconfig import Interface
         >>> BridgeIf('br0').set_max_age(30)
         """
-        self.set_interface('max_age', time)
+        self._apply_bridge_params({'max_age': time})
 
     def set_priority(self, priority):
         """
@@ -140,7 +226,7 @@ class BridgeIf(Interface):
         >>> from vyos.ifconfig import BridgeIf
         >>> BridgeIf('br0').set_priority(8192)
         """
-        self.set_interface('priority', priority)
+        self._apply_bridge_params({'priority': priority})
 
     def set_stp(self, state):
         """
@@ -150,7 +236,7 @@ class BridgeIf(Interface):
         >>> from vyos.ifconfig import BridgeIf
         >>> BridgeIf('br0').set_stp(1)
         """
-        self.set_interface('stp', state)
+        self._apply_bridge_params({'stp': state})
 
     def set_multicast_querier(self, enable):
         """
@@ -165,7 +251,7 @@ class BridgeIf(Interface):
         >>> from vyos.ifconfig import Interface
         >>> BridgeIf('br0').set_multicast_querier(1)
         """
-        self.set_interface('multicast_querier', enable)
+        self._apply_bridge_params({'multicast_querier': enable})
 
     def add_port(self, interface):
         """
@@ -176,7 +262,15 @@ class BridgeIf(Interface):
         >>> BridgeIf('br0').add_port('eth0')
         >>> BridgeIf('br0').add_port('eth1')
         """
-        return self.set_interface('add_port', interface)
+        if IPRoute is None:
+            self._run_ip_batch([f'link set dev {interface} master {self.ifname}'])
+            return None
+
+        self._debug_msg(f'netlink: link set dev {interface} master {self.ifname}')
+        with IPRoute() as ipr:
+            ipr.link('set', index=self._link_index(interface),
+                     master=self._link_index(self.ifname))
+        return None
 
     def del_port(self, interface):
         """
@@ -186,7 +280,84 @@ class BridgeIf(Interface):
         >>> from vyos.ifconfig import Interface
         >>> BridgeIf('br0').del_port('eth1')
         """
-        return self.set_interface('del_port', interface)
+        if IPRoute is None:
+            self._run_ip_batch([f'link set dev {interface} nomaster'])
+            return None
+
+        self._debug_msg(f'netlink: link set dev {interface} nomaster')
+        with IPRoute() as ipr:
+            ipr.link('set', index=self._link_index(interface), master=0)
+        return None
+
+    def set_admin_state(self, state, batch=None):
+        """
+        Set interface administrative state to be 'up' or 'down'. If batch is
+        a list, the ip(8) command is appended to it instead of executed, see
+        _run_ip_batch().
+
+        Example:
+        >>> from vyos.ifconfig import BridgeIf
+        >>> BridgeIf('br0').set_admin_state('down')
+        """
+        if batch is None:
+            return super().set_admin_state(state)
+
+        state = self._admin_state_to_apply(state)
+        if state:
+            batch.append(f'link set dev {self.ifname} {state}')
+        return None
+
+    def _run_ip_batch(self, lines):
+        """
+        Execute multiple ip(8) commands using a single process instead of
+        spawning one process per command. Every entry in lines is an ip(8)
+        command without the leading 'ip', e.g. 'link set dev eth0 nomaster'.
+        """
+        if not lines:
+            return None
+        for line in lines:
+            self._debug_msg(f'ip -batch: {line}')
+        return cmd(['ip', '-batch', '-'], self.debug, input='\n'.join(lines))
+
+    def _run_bridge_batch(self, lines):
+        """
+        Execute multiple bridge(8) commands using a single process, see
+        _run_ip_batch().
+        """
+        if not lines:
+            return None
+        for line in lines:
+            self._debug_msg(f'bridge -batch: {line}')
+        return cmd(['bridge', '-batch', '-'], self.debug, input='\n'.join(lines))
+
+    def _member_options(self, interface, interface_config, validated=False):
+        """
+        Return bridge(8) batch command setting the STP port options of member
+        interface, or None if no option needs to be changed. Validation is
+        skipped if validated is True.
+        """
+        options = []
+        for option, name in self._port_options:
+            value = interface_config.get(option)
+            if value is None:
+                continue
+            # the code can pass int as int
+            value = str(value)
+
+            # the port options are defined by STP
+            if not validated:
+                self._validate(STP._sysfs_set[name], name, value)
+
+            # skip port options which already have the requested value
+            location = STP._sysfs_set[name]['location'].format(ifname=interface)
+            if os.path.isfile(location) and self._read_sysfs(location) == value:
+                continue
+
+            options.append(f'{option} {value}')
+
+        if not options:
+            return None
+        return f'link set dev {interface} ' + ' '.join(options)
 
     def update(self, config):
         """ General helper function which works on a dictionary retrived by
@@ -197,60 +368,49 @@ class BridgeIf(Interface):
         # call base class first
         super().update(config)
 
-        # Set ageing time
-        value = config.get('aging')
-        self.set_ageing_time(value)
-
-        # set bridge forward delay
-        value = config.get('forwarding_delay')
-        self.set_forward_delay(value)
-
-        # set hello time
-        value = config.get('hello_time')
-        self.set_hello_time(value)
-
-        # set max message age
-        value = config.get('max_age')
-        self.set_max_age(value)
+        # walk the configuration only once
+        member = config.get('member') or {}
+        adds = member.get('interface') or {}
+        removes = member.get('interface_remove') or ()
+        querier = (config.get('igmp') or {}).get('querier') is not None
+        stp_enabled = 'stp' in config
 
-        # set bridge priority
-        value = config.get('priority')
-        self.set_priority(value)
+        # all ip(8) commands, executed by a single process
+        batch = []
 
+        # set all bridge options using a single netlink message
+        params = {attr: config.get(key) for attr, key in self._update_options}
         # enable/disable spanning tree
-        value = '1' if 'stp' in config else '0'
-        self.set_stp(value)
-
+        params['stp'] = '1' if stp_enabled else '0'
         # enable or disable IGMP querier
-        tmp = vyos_dict_search('igmp.querier', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_multicast_querier(value)
-
-        # remove interface from bridge
-        tmp = vyos_dict_search('member.interface_remove', config)
+        params['multicast_querier'] = '1' if querier else '0'
+        # config was validated by the CLI already
+        tmp = self._bridge_params_cmd(params, validated=True)
         if tmp:
-            for member in tmp:
-                self.del_port(member)
+            batch.append(tmp)
 
-        STPBridgeIf = STP.enable(BridgeIf)
-        tmp = vyos_dict_search('member.interface', config)
-        if tmp:
-            for interface, interface_config in tmp.items():
-                # if we've come here we already verified the interface
-                # does not have an addresses configured so just flush
-                # any remaining ones
-                Interface(interface).flush_addrs()
-                # enslave interface port to bridge
-                self.add_port(interface)
-
-                tmp = STPBridgeIf(interface)
-                # set bridge port path cost
-                value = interface_config.get('cost')
-                tmp.set_path_cost(value)
-
-                # set bridge port path priority
-                value = interface_config.get('priority')
-                tmp.set_path_priority(value)
+        # current member ports, only ports which are not yet (or still) part
+        # of the bridge need to be added (or removed)
+        brif = f'/sys/class/net/{self.ifname}/brif'
+        current = set(os.listdir(brif)) if os.path.isdir(brif) else set()
+
+        # remove interface from bridge
+        batch += [f'link set dev {interface} nomaster'
+                  for interface in removes if interface in current]
+
+        new = {interface: interface_config
+               for interface, interface_config in adds.items()
+               if interface not in current}
+        for interface in new:
+            # stop DHCP(v6) if running
+            Interface(interface).stop_dhcp()
+        # if we've come here we already verified the interface
+        # does not have an addresses configured so just flush
+        # any remaining ones
+        batch += [f'addr flush dev {interface}' for interface in new]
+        # enslave interface port to bridge
+        batch += [f'link set dev {interface} master {self.ifname}'
+                  for interface in new]
 
         # Enable/Disable of an interface must always be done at the end of the
         # derived class to make use of the ref-counting set_admin_state()
@@ -259,5 +419,18 @@ class BridgeIf(Interface):
         # as certain parameters can only be changed when the interface is
         # in admin-down state. This ensures the link does not flap during
         # reconfiguration.
+        # The admin state is changed in the same ip(8) batch as the member
+        # ports, STP port options below can be changed in any admin state.
         state = 'down' if 'disable' in config else 'up'
-        self.set_admin_state(state)
+        self.set_admin_state(state, batch=batch)
+
+        # apply bridge options, member port and admin state changes using a
+        # single ip(8) process
+        self._run_ip_batch(batch)
+
+        # bridge port options can only be set once the port is enslaved, set
+        # them for all members using a single bridge(8) process
+        batch = [self._member_options(interface, interface_config,
+                                      validated=True)
+                 for interface, interface_config in adds.items()]
+        self._run_bridge_batch([line for line in batch if line])
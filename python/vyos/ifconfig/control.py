@@ -81,20 +81,28 @@ class Control(Section):
 
         return values
 
-    def _set_command(self, config, name, value):
+    def _validate(self, option, name, value):
         """
-        Using the defined names, set data write to sysfs.
+        Check value using the validator of option name, option being its
+        _command_set or _sysfs_set entry. Nothing is checked if the option
+        has no validator.
         """
-        # the code can pass int as int
-        value = str(value)
-
-        validate = self._command_set[name].get('validate', None)
+        validate = option.get('validate', None)
         if validate:
             try:
                 validate(**self._values(name, validate, value))
             except Exception as e:
                 raise e.__class__(f'Could not set {name}. {e}')
 
+    def _set_command(self, config, name, value):
+        """
+        Using the defined names, set data write to sysfs.
+        """
+        # the code can pass int as int
+        value = str(value)
+
+        self._validate(self._command_set[name], name, value)
+
         convert = self._command_set[name].get('convert', None)
         if convert:
             value = convert(value)
@@ -149,12 +157,7 @@ class Control(Section):
         # the code can pass int as int
         value = str(value)
 
-        validate = self._sysfs_set[name].get('validate', None)
-        if validate:
-            try:
-                validate(**self._values(name, validate, value))
-            except Exception as e:
-                raise e.__class__(f'Could not set {name}. {e}')
+        self._validate(self._sysfs_set[name], name, value)
 
         config = {**config, **{'value': value}}
 
@@ -591,6 +591,17 @@ class Interface(Control):
         >>> Interface('eth0').get_admin_state()
         'down'
         """
+        state = self._admin_state_to_apply(state)
+        if state:
+            return self.set_interface('admin_state', state)
+        return None
+
+    def _admin_state_to_apply(self, state):
+        """
+        Update the admin state ref-counter for the requested state and return
+        the state which must be applied to the interface, or None if the
+        interface must not be changed.
+        """
         # A VLAN interface can only be placed in admin up state when
         # the lower interface is up, too
         if self.get_vlan_protocol():
@@ -605,10 +616,11 @@ class Interface(Control):
         if state == 'up':
             self._admin_state_down_cnt -= 1
             if self._admin_state_down_cnt < 1:
-                return self.set_interface('admin_state', state)
-        else:
-            self._admin_state_down_cnt += 1
-            return self.set_interface('admin_state', state)
+                return state
+            return None
+
+        self._admin_state_down_cnt += 1
+        return state
 
     def set_proxy_arp(self, enable):
         """
@@ -784,13 +796,18 @@ class Interface(Control):
 
         Will raise an exception on error.
         """
-        # stop DHCP(v6) if running
-        self.set_dhcp(False)
-        self.set_dhcpv6(False)
+        self.stop_dhcp()
 
         # flush all addresses
         self._cmd(f'ip addr flush dev "{self.ifname}"')
 
+    def stop_dhcp(self):
+        """
+        Stop DHCP and DHCPv6 clients of an interface if running.
+        """
+        self.set_dhcp(False)
+        self.set_dhcpv6(False)
+
     def add_to_bridge(self, br):
         """
         Adds the interface to the bridge with the passed port config.
@@ -24,11 +24,16 @@ import sys
 
 
 def _need_sudo(command):
-    return os.path.basename(command.split()[0]) in ('systemctl', )
+    # command is either a command line or an argument list
+    if isinstance(command, str):
+        command = command.split()
+    return os.path.basename(command[0]) in ('systemctl', )
 
 
 def _add_sudo(command):
     if _need_sudo(command):
+        if isinstance(command, list):
+            return ['sudo'] + command
         return 'sudo ' + command
     return command
 
@@ -65,6 +70,9 @@ def popen(command, flag='', shell=None, input=None, timeout=None, env=None,
     decode:  specify the expected text encoding (utf-8, ascii, ...)
              the default is explicitely utf-8 which is python's own default
 
+    command can be an argument list instead of a command line, it is then
+    executed without a shell.
+
     usage:
     get both stdout and stderr: popen('command', stdout=PIPE, stderr=STDOUT)
     discard stdout and get stderr: popen('command', stdout=DEVNUL, stderr=PIPE)
@@ -89,9 +97,10 @@ def popen(command, flag='', shell=None, input=None, timeout=None, env=None,
     stdin = None
     if shell is None:
         use_shell = False
-        if ' ' in command:
+        # an argument list never requires a shell
+        if isinstance(command, str) and ' ' in command:
             use_shell = True
-        if env:
+        if isinstance(command, str) and env:
             use_shell = True
 
     if input:
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import unittest
+from unittest import TestCase
+from unittest import mock
+
+from vyos.ifconfig.bridge import BridgeIf
+from vyos.ifconfig.interface import Interface
+
+# sysfs state of an existing bridge br0 with kernel default options and
+# member port eth0
+SYSFS = {
+    '/sys/class/net/br0/bridge/ageing_time': '30000',
+    '/sys/class/net/br0/bridge/forward_delay': '1500',
+    '/sys/class/net/br0/bridge/hello_time': '200',
+    '/sys/class/net/br0/bridge/max_age': '2000',
+    '/sys/class/net/br0/bridge/priority': '32768',
+    '/sys/class/net/br0/bridge/stp_state': '0',
+    '/sys/class/net/br0/bridge/multicast_querier': '0',
+    '/sys/class/net/eth0/brport/path_cost': '100',
+    '/sys/class/net/eth0/brport/priority': '32',
+}
+
+# bridge configuration matching SYSFS
+CONFIG = {
+    'aging': '300',
+    'forwarding_delay': '15',
+    'hello_time': '2',
+    'max_age': '20',
+    'priority': '32768',
+    'member': {
+        'interface': {
+            'eth0': {'cost': '100', 'priority': '32'},
+        },
+    },
+}
+
+
+def _init(interface, ifname, **kargs):
+    """ Interface.__init__() replacement not touching the system """
+    interface.ifname = ifname
+    interface.config = {'ifname': ifname, 'type': 'bridge'}
+    interface.debug = ''
+    interface._admin_state_down_cnt = 0
+
+
+class TestBridgeIf(TestCase):
+    def setUp(self):
+        self.sysfs = dict(SYSFS)
+        self.members = ['eth0']
+
+        # do not touch the system, work on the sysfs dictionary above and
+        # record the ip(8) and bridge(8) batches instead of executing them
+        patches = [
+            mock.patch.object(Interface, '__init__', _init),
+            mock.patch.object(Interface, 'update'),
+            mock.patch.object(BridgeIf, 'get_vlan_protocol', return_value=None),
+            mock.patch.object(BridgeIf, '_read_sysfs',
+                              side_effect=lambda filename: self.sysfs[filename]),
+            mock.patch.object(BridgeIf, '_run_ip_batch'),
+            mock.patch.object(BridgeIf, '_run_bridge_batch'),
+            mock.patch.object(BridgeIf, '_cmd'),
+            mock.patch('os.path.isfile',
+                       side_effect=lambda filename: filename in self.sysfs),
+            mock.patch('os.path.isdir', return_value=True),
+            mock.patch('os.listdir', side_effect=lambda _: self.members),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        # new member ports are instantiated to stop their DHCP clients
+        patch = mock.patch('vyos.ifconfig.bridge.Interface')
+        self.member_interface = patch.start()
+        self.addCleanup(patch.stop)
+
+        self.bridge = BridgeIf('br0')
+
+    def update(self, config):
+        self.bridge.update(config)
+        ip_batch = self.bridge._run_ip_batch.call_args[0][0]
+        bridge_batch = self.bridge._run_bridge_batch.call_args[0][0]
+        return ip_batch, bridge_batch
+
+    def test_unchanged(self):
+        ip_batch, bridge_batch = self.update(CONFIG)
+        self.assertEqual(ip_batch, ['link set dev br0 up'])
+        self.assertEqual(bridge_batch, [])
+        self.member_interface.assert_not_called()
+
+    def test_bridge_options(self):
+        config = {**CONFIG, 'aging': '60', 'stp': {}, 'igmp': {'querier': {}}}
+        ip_batch, _ = self.update(config)
+        self.assertEqual(ip_batch, [
+            'link set dev br0 type bridge ageing_time 6000 stp_state 1 mcast_querier 1',
+            'link set dev br0 up',
+        ])
+
+    def test_set_options(self):
+        self.bridge.set_ageing_time(60)
+        self.bridge._cmd.assert_called_once_with(
+            'ip link set dev br0 type bridge ageing_time 6000')
+        self.bridge._cmd.reset_mock()
+        self.bridge.set_stp(1)
+        self.bridge._cmd.assert_called_once_with(
+            'ip link set dev br0 type bridge stp_state 1')
+        self.bridge._cmd.reset_mock()
+        self.bridge.set_multicast_querier(1)
+        self.bridge._cmd.assert_called_once_with(
+            'ip link set dev br0 type bridge mcast_querier 1')
+
+    def test_set_options_unchanged(self):
+        self.bridge.set_ageing_time(300)
+        self.bridge.set_forward_delay(15)
+        self.bridge.set_hello_time(2)
+        self.bridge.set_max_age(20)
+        self.bridge.set_priority(32768)
+        self.bridge.set_stp(0)
+        self.bridge.set_multicast_querier(0)
+        self.bridge._cmd.assert_not_called()
+
+    def test_set_options_validate(self):
+        with self.assertRaises(ValueError):
+            self.bridge.set_priority(-1)
+        with self.assertRaises(ValueError):
+            self.bridge.set_stp(2)
+        self.bridge._cmd.assert_not_called()
+
+    def test_bridge_params_cmd_validate(self):
+        with self.assertRaises(ValueError):
+            self.bridge._bridge_params_cmd({'priority': '-1'})
+
+    def test_member_options(self):
+        self.assertEqual(
+            self.bridge._member_options('eth0', {'cost': '100', 'priority': '32'}),
+            None)
+        self.assertEqual(
+            self.bridge._member_options('eth0', {'cost': '4', 'priority': '32'}),
+            'link set dev eth0 cost 4')
+        # options of ports not yet enslaved are always set
+        self.assertEqual(
+            self.bridge._member_options('eth1', {'cost': '4', 'priority': '8'}),
+            'link set dev eth1 cost 4 priority 8')
+        with self.assertRaises(ValueError):
+            self.bridge._member_options('eth1', {'cost': '-1'})
+
+    def test_members(self):
+        self.members = ['eth0', 'eth2', 'eth3']
+        config = {
+            **CONFIG,
+            'aging': '60',
+            'disable': {},
+            'member': {
+                'interface': {
+                    'eth0': {'cost': '100', 'priority': '32'},
+                    'eth1': {'cost': '4'},
+                },
+                # eth4 is not a member, nothing to remove
+                'interface_remove': ['eth2', 'eth4'],
+            },
+        }
+        ip_batch, bridge_batch = self.update(config)
+        # order: bridge options, nomaster, addr flush, master, admin state
+        self.assertEqual(ip_batch, [
+            'link set dev br0 type bridge ageing_time 6000',
+            'link set dev eth2 nomaster',
+            'addr flush dev eth1',
+            'link set dev eth1 master br0',
+            'link set dev br0 down',
+        ])
+        self.assertEqual(bridge_batch, ['link set dev eth1 cost 4'])
+        self.member_interface.assert_called_once_with('eth1')
+        self.member_interface.return_value.stop_dhcp.assert_called_once_with()
+
+    def test_batch_order(self):
+        # bridge port options can only be set once the port is enslaved
+        calls = mock.Mock()
+        calls.attach_mock(self.bridge._run_ip_batch, 'ip')
+        calls.attach_mock(self.bridge._run_bridge_batch, 'bridge')
+        self.update(CONFIG)
+        self.assertEqual([name for name, _, _ in calls.mock_calls],
+                         ['ip', 'bridge'])
+
+    @mock.patch('vyos.ifconfig.bridge.IPRoute', None)
+    def test_add_del_port_ip(self):
+        self.bridge.add_port('eth1')
+        self.bridge._run_ip_batch.assert_called_with(
+            ['link set dev eth1 master br0'])
+        self.bridge.del_port('eth1')
+        self.bridge._run_ip_batch.assert_called_with(
+            ['link set dev eth1 nomaster'])
+
+    @mock.patch('socket.if_nametoindex', side_effect={'br0': 5, 'eth1': 3}.get)
+    @mock.patch('vyos.ifconfig.bridge.IPRoute')
+    def test_add_del_port_netlink(self, iproute, _):
+        ipr = iproute.return_value.__enter__.return_value
+        self.bridge.add_port('eth1')
+        ipr.link.assert_called_with('set', index=3, master=5)
+        self.bridge.del_port('eth1')
+        ipr.link.assert_called_with('set', index=3, master=0)
+        # the netlink socket is closed after every request
+        self.assertEqual(iproute.return_value.__exit__.call_count, 2)
+        self.bridge._run_ip_batch.assert_not_called()
+
+    def test_admin_state_refcount(self):
+        batch = []
+        self.bridge.set_admin_state('down', batch=batch)
+        self.bridge.set_admin_state('down', batch=batch)
+        self.bridge.set_admin_state('up', batch=batch)
+        self.assertEqual(batch, ['link set dev br0 down'] * 2)
+        self.bridge.set_admin_state('up', batch=batch)
+        self.assertEqual(batch[-1], 'link set dev br0 up')
+
+
+if __name__ == '__main__':
+    unittest.main()
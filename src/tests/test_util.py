@@ -32,3 +32,12 @@ class TestVyOSUtil(TestCase):
         new_data = vyos.util.mangle_dict_keys(data, '-', '_')
         self.assertEqual(new_data, expected_data)
 
+    def test_add_sudo(self):
+        self.assertEqual(vyos.util._add_sudo('ip -batch -'), 'ip -batch -')
+        self.assertEqual(vyos.util._add_sudo('systemctl stop foo'),
+                         'sudo systemctl stop foo')
+        self.assertEqual(vyos.util._add_sudo(['ip', '-batch', '-']),
+                         ['ip', '-batch', '-'])
+        self.assertEqual(vyos.util._add_sudo(['systemctl', 'stop', 'foo']),
+                         ['sudo', 'systemctl', 'stop', 'foo'])
+